@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=['whisper'],
+    hiddenimports=['faster_whisper', 'ctranslate2', 'multipart'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
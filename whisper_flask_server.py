@@ -5,98 +5,364 @@ No requiere Flask, solo la biblioteca http.server incluida en Python
 """
 
 import http.server
-import socketserver
 import json
 import os
-import tempfile
 import urllib.parse
 import mimetypes
-import whisper
+import ctranslate2
+import numpy as np
+from faster_whisper import BatchedInferencePipeline, WhisperModel, decode_audio
+from multipart import MultipartParser, parse_options_header
+try:
+    from pywhispercpp.constants import AVAILABLE_MODELS as WHISPER_CPP_MODELS
+    from pywhispercpp.model import Model as WhisperCppModel
+except ImportError:
+    WhisperCppModel = None
+    WHISPER_CPP_MODELS = ()
 import io
 from pathlib import Path
 import threading
 import time
+import queue
+import bisect
+import gc
+from collections import OrderedDict
+from types import SimpleNamespace
 
 # Puerto del servidor
 PORT = 8000
 
-# Cache de modelos Whisper
-model_cache = {}
+# Frecuencia de muestreo que espera Whisper
+SAMPLE_RATE = 16000
+
+# Subidas más grandes que esto se vuelcan a disco mientras se reciben
+SPOOL_MAX_SIZE = 32 * 1024 * 1024
+
+# Dispositivo para CTranslate2
+DEVICE = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+
+def select_compute_type(device):
+    """Elegir la precisión más ligera soportada (float16/bfloat16 en GPU, int8 en CPU)"""
+    override = os.environ.get("WHISPER_COMPUTE_TYPE")
+    if override:
+        return override
+    supported = ctranslate2.get_supported_compute_types(device)
+    preferred = ("float16", "bfloat16", "int8_float16") if device == "cuda" else ("int8", "int8_float32")
+    for compute_type in preferred:
+        if compute_type in supported:
+            return compute_type
+    return "float32"
+
+COMPUTE_TYPE = select_compute_type(DEVICE)
+
+# FlashAttention de CTranslate2 en GPU, opcional: requiere Ampere o superior y una
+# compilación de CTranslate2 que la incluya (activar con WHISPER_FLASH_ATTENTION=1)
+FLASH_ATTENTION = DEVICE == "cuda" and os.environ.get("WHISPER_FLASH_ATTENTION", "0") == "1"
+
+# En CPU se usa whisper.cpp (pesos GGML cuantizados) si pywhispercpp está instalado;
+# WHISPER_BACKEND=faster-whisper fuerza CTranslate2 int8
+USE_WHISPER_CPP = (
+    DEVICE == "cpu"
+    and WhisperCppModel is not None
+    and os.environ.get("WHISPER_BACKEND", "auto") in ("auto", "whispercpp")
+)
+WHISPER_CPP_QUANT = os.environ.get("WHISPER_CPP_QUANT", "q8_0")
+
+# Alias de faster-whisper que en whisper.cpp tienen otro nombre
+WHISPER_CPP_ALIASES = {"large": "large-v3", "turbo": "large-v3-turbo"}
+
+def whisper_cpp_model_name(model_size):
+    """Nombre del modelo GGML para whisper.cpp, o None si no existe esa variante
+    
+    Se prefiere la versión cuantizada (WHISPER_CPP_QUANT) y si no la hay, la
+    completa; sin ninguna de las dos se usa CTranslate2.
+    """
+    base = WHISPER_CPP_ALIASES.get(model_size, model_size)
+    for name in (f"{base}-{WHISPER_CPP_QUANT}", base):
+        if name in WHISPER_CPP_MODELS:
+            return name
+    return None
+
+class WhisperCppPipeline:
+    """Adaptador de whisper.cpp con la misma interfaz transcribe() que faster-whisper"""
+    
+    def __init__(self, model_name):
+        self.model = WhisperCppModel(
+            model_name,
+            n_threads=os.cpu_count(),
+            print_progress=False,
+            print_realtime=False
+        )
+    
+    def transcribe(self, audio, language=None, **kwargs):
+        """Transcribir con marcas por palabra; devuelve (segmentos, info) como faster-whisper"""
+        # max_len=1 + split_on_word hace que cada segmento de whisper.cpp sea una palabra
+        results = self.model.transcribe(
+            audio,
+            language=language or "auto",
+            token_timestamps=True,
+            max_len=1,
+            split_on_word=True
+        )
+        
+        # Reagrupar las palabras en frases, cortando en puntuación final
+        segments = []
+        words = []
+        for result in results:
+            text = result.text
+            if not text.strip():
+                continue
+            # whisper.cpp da los tiempos en centésimas de segundo
+            words.append(SimpleNamespace(start=result.t0 / 100, end=result.t1 / 100, word=text))
+            if text.rstrip().endswith(('.', '?', '!')):
+                segments.append(SimpleNamespace(words=words))
+                words = []
+        if words:
+            segments.append(SimpleNamespace(words=words))
+        
+        return segments, SimpleNamespace(language=language)
+
+# Tamaño de lote por defecto para la inferencia por lotes (VAD + chunks de ~30s)
+DEFAULT_BATCH_SIZE = 8 if DEVICE == "cuda" else 1
+
+# Cache LRU de modelos Whisper, indexado por (tamaño, compute_type)
+MAX_MODELS = int(os.environ.get("WHISPER_MAX_MODELS", "1"))
+model_cache = OrderedDict()
+model_cache_lock = threading.RLock()
+
+# Modelo que se carga al arrancar y se usa si el formulario no indica otro
+DEFAULT_MODEL = os.environ.get("WHISPER_DEFAULT_MODEL", "base")
 
 def get_model(model_size):
-    """Obtener modelo desde cache o cargarlo"""
-    if model_size not in model_cache:
-        print(f"📥 Cargando modelo Whisper: {model_size}")
-        model_cache[model_size] = whisper.load_model(model_size)
+    """Obtener pipeline por lotes desde cache o cargar el modelo"""
+    with model_cache_lock:
+        return _get_model_locked(model_size)
+
+def _get_model_locked(model_size):
+    cpp_name = whisper_cpp_model_name(model_size) if USE_WHISPER_CPP else None
+    key = (model_size, "ggml-" + cpp_name if cpp_name else COMPUTE_TYPE)
+    if key in model_cache:
+        model_cache.move_to_end(key)
+    else:
+        # Liberar los modelos menos usados antes de cargar uno nuevo
+        while len(model_cache) >= max(MAX_MODELS, 1):
+            old_key, old_model = model_cache.popitem(last=False)
+            print(f"🗑️ Liberando modelo {old_key[0]}")
+            del old_model
+            gc.collect()
+        if cpp_name:
+            print(f"📥 Cargando modelo whisper.cpp: {cpp_name}")
+            model = WhisperCppPipeline(cpp_name)
+            warmup_model(model)
+            model_cache[key] = model
+            print(f"✅ Modelo {model_size} cargado")
+            return model
+        
+        print(f"📥 Cargando modelo Whisper: {model_size} ({DEVICE}, {COMPUTE_TYPE})")
+        model = WhisperModel(
+            model_size,
+            device=DEVICE,
+            compute_type=COMPUTE_TYPE,
+            flash_attention=FLASH_ATTENTION
+        )
+        warmup_model(model)
+        model_cache[key] = BatchedInferencePipeline(model=model)
         print(f"✅ Modelo {model_size} cargado")
-    return model_cache[model_size]
+    return model_cache[key]
+
+def preload_models():
+    """Precargar en segundo plano los modelos de WHISPER_PRELOAD que quepan en la cache"""
+    extra = [m.strip() for m in os.environ.get("WHISPER_PRELOAD", "").split(",") if m.strip()]
+    for model_size in extra[:max(MAX_MODELS - 1, 0)]:
+        get_model(model_size)
+
+def warmup_model(model):
+    """Pasar un segundo de silencio para inicializar kernels antes del primer usuario"""
+    silence = np.zeros(SAMPLE_RATE, dtype=np.float32)
+    segments_iter, info = model.transcribe(silence, language="en", beam_size=1)
+    list(segments_iter)
+
+# Hilos de decodificación, acotados para no quitar CPU al hilo de la GPU
+DECODE_WORKERS = 2
+
+# Cola acotada de trabajos con el audio aún comprimido: las peticiones esperan
+MAX_PENDING_JOBS = 16
+job_queue = queue.Queue(maxsize=MAX_PENDING_JOBS)
+
+# Máximo de trabajos agrupados en una sola pasada del pipeline
+MAX_BATCH_JOBS = 4
+
+# Trabajos ya decodificados a PCM para el único hilo que usa la GPU. Solo se
+# decodifica un lote por delante para no tener todos los pendientes en memoria
+ready_queue = queue.Queue(maxsize=MAX_BATCH_JOBS)
+
+def decode_worker():
+    """Decodificar los trabajos recibidos justo antes de pasarlos a la GPU"""
+    while True:
+        job = job_queue.get()
+        try:
+            job['audio'] = decode_audio(job.pop('audio_file'), sampling_rate=SAMPLE_RATE)
+        except Exception as e:
+            job['error'] = e
+            job['done'].set()
+            continue
+        finally:
+            job_queue.task_done()
+        print(f"🎧 Audio decodificado ({len(job['audio']) / SAMPLE_RATE:.1f}s)")
+        # Se bloquea mientras haya un lote completo esperando a la GPU
+        ready_queue.put(job)
+
+# Silencio insertado entre archivos agrupados. El VAD de faster-whisper une
+# los tramos de voz en ventanas de hasta 30 s sin mirar los silencios, así
+# que el hueco debe superar esa ventana (más el relleno del VAD) para que
+# ningún chunk decodificado mezcle el final de un archivo con el inicio del
+# siguiente. Los ceros solo cuestan tiempo de VAD, no de decodificación.
+VAD_CHUNK_SECONDS = 30
+BATCH_GAP_SECONDS = VAD_CHUNK_SECONDS + 2.0
+
+def transcribe_job(job):
+    """Transcribir un único trabajo"""
+    print(f"🤖 Cargando modelo {job['model_size']}...")
+    model = get_model(job['model_size'])
+    
+    print("🎙️ Iniciando transcripción...")
+    segments_iter, info = model.transcribe(
+        job['audio'],
+        language=job['language'],
+        batch_size=job['batch_size'],
+        word_timestamps=True,
+        vad_filter=True,
+        beam_size=1
+    )
+    # faster-whisper devuelve un generador perezoso
+    job['segments'] = list(segments_iter)
+
+def transcribe_group(group):
+    """Transcribir varios trabajos en una sola pasada por lotes
+    
+    Los audios se concatenan separados por silencio, de modo que los chunks
+    del VAD de todos los archivos se decodifican juntos en los mismos lotes.
+    Después las palabras se reparten a cada trabajo según su desplazamiento.
+    """
+    first = group[0]
+    print(f"🤖 Cargando modelo {first['model_size']}...")
+    model = get_model(first['model_size'])
+    gap = np.zeros(int(BATCH_GAP_SECONDS * SAMPLE_RATE), dtype=np.float32)
+    
+    pieces = []
+    offsets = []
+    position = 0
+    for job in group:
+        offsets.append(position / SAMPLE_RATE)
+        pieces.append(job['audio'])
+        pieces.append(gap)
+        position += len(job['audio']) + len(gap)
+    
+    print(f"🎙️ Iniciando transcripción agrupada de {len(group)} archivos...")
+    segments_iter, info = model.transcribe(
+        np.concatenate(pieces),
+        language=first['language'],
+        batch_size=first['batch_size'],
+        word_timestamps=True,
+        vad_filter=True,
+        beam_size=1
+    )
+    
+    per_job = [[] for _ in group]
+    for segment in segments_iter:
+        buckets = {}
+        for word in segment.words or []:
+            index = bisect.bisect_right(offsets, word.start) - 1
+            offset = offsets[index]
+            buckets.setdefault(index, []).append(SimpleNamespace(
+                start=word.start - offset,
+                end=word.end - offset,
+                word=word.word
+            ))
+        for index, words in buckets.items():
+            per_job[index].append(SimpleNamespace(words=words))
+    
+    for job, segments in zip(group, per_job):
+        job['segments'] = segments
+
+def transcription_worker():
+    """Procesar trabajos de la cola, agrupando los compatibles"""
+    while True:
+        jobs = [ready_queue.get()]
+        while len(jobs) < MAX_BATCH_JOBS:
+            try:
+                jobs.append(ready_queue.get_nowait())
+            except queue.Empty:
+                break
+        
+        # Con auto-detección cada archivo necesita su propio idioma; whisper.cpp
+        # no tiene VAD ni lotes, así que agrupar solo le añadiría silencio que decodificar
+        groups = {}
+        for job in jobs:
+            uses_whisper_cpp = USE_WHISPER_CPP and whisper_cpp_model_name(job['model_size'])
+            if job['language'] and not uses_whisper_cpp:
+                key = (job['model_size'], job['language'], job['batch_size'])
+            else:
+                key = id(job)
+            groups.setdefault(key, []).append(job)
+        
+        for group in groups.values():
+            try:
+                if len(group) == 1:
+                    transcribe_job(group[0])
+                else:
+                    transcribe_group(group)
+            except Exception as e:
+                for job in group:
+                    job['error'] = e
+            finally:
+                for job in group:
+                    # El PCM ya no hace falta mientras la petición genera el SRT
+                    job.pop('audio', None)
+                    job['done'].set()
 
 def format_timestamp(seconds):
     """Convierte segundos a formato SRT"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    milliseconds = int((seconds % 1) * 1000)
-    return f"{hours:02d}:{minutes:02d}:{secs:02d},{milliseconds:03d}"
+    # Redondear a milisegundos enteros (0.9999s -> 00:00:01,000)
+    secs, milliseconds = divmod(round(seconds * 1000), 1000)
+    minutes, secs = divmod(secs, 60)
+    hours, minutes = divmod(minutes, 60)
+    return "%02d:%02d:%02d,%03d" % (hours, minutes, secs, milliseconds)
 
 def create_srt_content(segments, words_per_line=5):
     """Crear contenido SRT con palabras personalizables"""
-    srt_content = []
+    buffer = io.StringIO()
     subtitle_index = 1
     
     for segment in segments:
-        if 'words' not in segment:
+        words = segment.words
+        if not words:
             continue
-            
-        words = segment['words']
-        i = 0
         
-        while i < len(words):
-            line_words = []
-            start_time = words[i]['start']
-            
-            word_count = 0
-            while i < len(words) and word_count < words_per_line:
-                line_words.append(words[i]['word'].strip())
-                word_count += 1
-                i += 1
-            
-            end_time = words[i-1]['end'] if i > 0 else start_time + 0.5
-            
-            text = ' '.join(line_words)
-            start_formatted = format_timestamp(start_time)
-            end_formatted = format_timestamp(end_time)
+        for chunk_start in range(0, len(words), words_per_line):
+            chunk = words[chunk_start:chunk_start + words_per_line]
+            text = ' '.join(word.word.strip() for word in chunk)
             
-            srt_content.append(f"{subtitle_index}")
-            srt_content.append(f"{start_formatted} --> {end_formatted}")
-            srt_content.append(text)
-            srt_content.append("")
+            # Los bloques se separan con una línea en blanco
+            if subtitle_index > 1:
+                buffer.write("\n")
+            buffer.write(f"{subtitle_index}\n{format_timestamp(chunk[0].start)} --> {format_timestamp(chunk[-1].end)}\n{text}\n")
             
             subtitle_index += 1
     
-    return '\n'.join(srt_content)
+    return buffer.getvalue()
 
-class WhisperRequestHandler(http.server.BaseHTTPRequestHandler):
-    
-    def do_GET(self):
-        """Manejar peticiones GET"""
-        if self.path == '/':
-            self.serve_html()
-        elif self.path == '/health':
-            self.serve_health()
-        else:
-            self.send_error(404, "Página no encontrada")
-    
-    def do_POST(self):
-        """Manejar peticiones POST"""
-        if self.path == '/transcribe':
-            self.handle_transcribe()
-        else:
-            self.send_error(404, "Endpoint no encontrado")
-    
-    def serve_html(self):
-        """Servir la página HTML principal"""
-        html_content = '''<!DOCTYPE html>
+# Tamaño de lectura al parsear el cuerpo multipart
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Límite para campos de texto del formulario (no archivos)
+MAX_FIELD_SIZE = 64 * 1024
+
+# Tamaño de cada escritura al enviar el SRT
+RESPONSE_CHUNK_SIZE = 64 * 1024
+
+# Página principal, codificada una sola vez al importar el módulo
+HTML_CONTENT = '''<!DOCTYPE html>
 <html>
 <head>
     <title>Whisper Simple Server</title>
@@ -127,6 +393,11 @@ class WhisperRequestHandler(http.server.BaseHTTPRequestHandler):
                 <input type="number" id="wordsPerLine" value="5" min="1" max="20">
             </div>
             
+            <div>
+                <label>Tamaño de lote:</label>
+                <input type="number" id="batchSize" placeholder="auto" min="1" max="32">
+            </div>
+            
             <div>
                 <label>Modelo:</label>
                 <select id="modelSize">
@@ -196,6 +467,7 @@ class WhisperRequestHandler(http.server.BaseHTTPRequestHandler):
             formData.append('audio', file);
             formData.append('words_per_line', document.getElementById('wordsPerLine').value);
             formData.append('model_size', document.getElementById('modelSize').value);
+            formData.append('batch_size', document.getElementById('batchSize').value);
             formData.append('language', document.getElementById('language').value);
 
             try {
@@ -242,20 +514,66 @@ class WhisperRequestHandler(http.server.BaseHTTPRequestHandler):
     </script>
 </body>
 </html>'''
-        
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html; charset=utf-8')
-        self.end_headers()
-        self.wfile.write(html_content.encode('utf-8'))
+HTML_BYTES = HTML_CONTENT.encode('utf-8')
+
+# Respuesta fija del endpoint de salud
+HEALTH_BYTES = json.dumps({"status": "ok", "message": "Servidor funcionando"}).encode('utf-8')
+
+# Respuestas HTTP completas (estado + cabeceras + cuerpo) listas para enviar
+HTML_RESPONSE = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: text/html; charset=utf-8\r\n"
+    b"Content-Length: %d\r\n"
+    b"\r\n" % len(HTML_BYTES)
+) + HTML_BYTES
+
+HEALTH_RESPONSE = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: application/json\r\n"
+    b"Content-Length: %d\r\n"
+    b"Access-Control-Allow-Origin: *\r\n"
+    b"\r\n" % len(HEALTH_BYTES)
+) + HEALTH_BYTES
+
+# Cabecera de la respuesta SRT; solo falta la longitud del cuerpo
+SRT_RESPONSE_HEAD = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: text/plain; charset=utf-8\r\n"
+    b"Content-Length: %d\r\n"
+    b"Content-Disposition: attachment; filename=\"transcription.srt\"\r\n"
+    b"Access-Control-Allow-Origin: *\r\n"
+    b"\r\n"
+)
+
+class WhisperRequestHandler(http.server.BaseHTTPRequestHandler):
+    # Keep-alive: todas las respuestas llevan Content-Length
+    protocol_version = "HTTP/1.1"
+    
+    def do_GET(self):
+        """Manejar peticiones GET"""
+        if self.path == '/':
+            self.serve_html()
+        elif self.path == '/health':
+            self.serve_health()
+        else:
+            self.send_error(404, "Página no encontrada")
+    
+    def do_POST(self):
+        """Manejar peticiones POST"""
+        if self.path == '/transcribe':
+            self.handle_transcribe()
+        else:
+            self.send_error(404, "Endpoint no encontrado")
+    
+    def serve_html(self):
+        """Servir la página HTML principal"""
+        self.log_request(200)
+        self.wfile.write(HTML_RESPONSE)
     
     def serve_health(self):
         """Endpoint de salud"""
-        response = {"status": "ok", "message": "Servidor funcionando"}
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        self.wfile.write(json.dumps(response).encode('utf-8'))
+        self.log_request(200)
+        self.wfile.write(HEALTH_RESPONSE)
     
     def handle_transcribe(self):
         """Manejar la transcripción de audio"""
@@ -266,103 +584,97 @@ class WhisperRequestHandler(http.server.BaseHTTPRequestHandler):
                 self.send_error(400, "No hay contenido")
                 return
             
-            # Leer los datos
-            post_data = self.rfile.read(content_length)
-            
-            # Parsear multipart/form-data manualmente (simplificado)
-            boundary = None
-            content_type = self.headers.get('Content-Type', '')
-            if 'boundary=' in content_type:
-                boundary = content_type.split('boundary=')[1].encode()
+            # Parsear multipart/form-data por bloques
+            content_type, options = parse_options_header(self.headers.get('Content-Type', ''))
+            boundary = options.get('boundary')
             
-            if not boundary:
+            if content_type != 'multipart/form-data' or not boundary:
                 self.send_error(400, "Boundary no encontrado")
                 return
             
-            # Extraer archivo y parámetros
-            parts = post_data.split(b'--' + boundary)
-            
-            audio_data = None
-            words_per_line = 5
-            model_size = 'base'
-            language = None
-            
-            for part in parts:
-                if b'Content-Disposition: form-data' in part:
-                    if b'name="audio"' in part and b'filename=' in part:
-                        # Extraer archivo de audio
-                        header_end = part.find(b'\r\n\r\n')
-                        if header_end != -1:
-                            audio_data = part[header_end + 4:]
-                            # Remover el final si existe
-                            if audio_data.endswith(b'\r\n'):
-                                audio_data = audio_data[:-2]
-                    
-                    elif b'name="words_per_line"' in part:
-                        header_end = part.find(b'\r\n\r\n')
-                        if header_end != -1:
-                            value = part[header_end + 4:].decode().strip()
-                            words_per_line = int(value) if value.isdigit() else 5
-                    
-                    elif b'name="model_size"' in part:
-                        header_end = part.find(b'\r\n\r\n')
-                        if header_end != -1:
-                            model_size = part[header_end + 4:].decode().strip()
-                    
-                    elif b'name="language"' in part:
-                        header_end = part.find(b'\r\n\r\n')
-                        if header_end != -1:
-                            lang = part[header_end + 4:].decode().strip()
-                            if lang != 'auto':
-                                language = lang
-            
-            if not audio_data:
-                self.send_error(400, "Archivo de audio no encontrado")
-                return
-            
-            print(f"📁 Procesando archivo de audio ({len(audio_data)} bytes)")
-            print(f"⚙️ Configuración: {words_per_line} palabras/línea, modelo {model_size}")
-            
-            # Guardar archivo temporal
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.tmp') as temp_file:
-                temp_file.write(audio_data)
-                temp_path = temp_file.name
-            
+            # El audio queda comprimido en memoria (pasa a disco solo si es muy
+            # grande) hasta que el hilo de decodificación lo necesita
+            parser = MultipartParser(
+                self.rfile,
+                boundary,
+                content_length=content_length,
+                buffer_size=UPLOAD_CHUNK_SIZE,
+                spool_limit=SPOOL_MAX_SIZE,
+                memory_limit=SPOOL_MAX_SIZE + MAX_FIELD_SIZE * 8
+            )
             try:
-                # Cargar modelo y transcribir
-                print(f"🤖 Cargando modelo {model_size}...")
-                model = get_model(model_size)
-                
-                print("🎙️ Iniciando transcripción...")
-                result = model.transcribe(
-                    temp_path,
-                    language=language,
-                    word_timestamps=True,
-                    verbose=False
-                )
-                
-                print("📄 Generando archivo SRT...")
-                srt_content = create_srt_content(result['segments'], words_per_line)
-                
-                # Enviar respuesta
-                self.send_response(200)
-                self.send_header('Content-Type', 'text/plain; charset=utf-8')
-                self.send_header('Content-Disposition', 'attachment; filename="transcription.srt"')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(srt_content.encode('utf-8'))
-                
-                print(f"✅ Transcripción completada - {len(result['segments'])} segmentos")
-                
+                self.transcribe_upload(parser)
             finally:
-                # Limpiar archivo temporal
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
+                for part in parser.parts():
+                    part.close()
         
         except Exception as e:
             print(f"❌ Error: {str(e)}")
             self.send_error(500, f"Error interno: {str(e)}")
     
+    def transcribe_upload(self, parser):
+        """Leer el formulario, encolar el audio y responder con el SRT"""
+        fields = {}
+        audio_file = None
+        audio_size = 0
+        for part in parser:
+            if part.name == 'audio' and part.filename:
+                audio_size = part.size
+                if audio_size:
+                    audio_file = part.file
+            elif not part.filename and part.size <= MAX_FIELD_SIZE:
+                fields[part.name] = part.value
+        
+        if audio_file is None:
+            self.send_error(400, "Archivo de audio no encontrado")
+            return
+        
+        value = fields.get('words_per_line', '').strip()
+        words_per_line = max(int(value), 1) if value.isdigit() else 5
+        
+        model_size = fields.get('model_size', DEFAULT_MODEL).strip()
+        
+        value = fields.get('batch_size', '').strip()
+        batch_size = int(value) if value.isdigit() and int(value) > 0 else DEFAULT_BATCH_SIZE
+        
+        lang = fields.get('language', 'auto').strip()
+        language = lang if lang != 'auto' else None
+        
+        print(f"📁 Procesando archivo de audio ({audio_size} bytes)")
+        print(f"⚙️ Configuración: {words_per_line} palabras/línea, modelo {model_size}, lote {batch_size}")
+        
+        # Encolar el trabajo y esperar a que se decodifique y transcriba
+        audio_file.seek(0)
+        job = {
+            'audio_file': audio_file,
+            'model_size': model_size,
+            'language': language,
+            'batch_size': batch_size,
+            'done': threading.Event()
+        }
+        try:
+            job_queue.put_nowait(job)
+        except queue.Full:
+            self.send_error(503, "Servidor ocupado, intenta más tarde")
+            return
+        
+        job['done'].wait()
+        if 'error' in job:
+            raise job['error']
+        segments = job['segments']
+        
+        print("📄 Generando archivo SRT...")
+        srt_content = create_srt_content(segments, words_per_line)
+        
+        # Enviar respuesta por bloques con longitud conocida
+        data = memoryview(srt_content.encode('utf-8'))
+        self.log_request(200)
+        self.wfile.write(SRT_RESPONSE_HEAD % len(data))
+        for offset in range(0, len(data), RESPONSE_CHUNK_SIZE):
+            self.wfile.write(data[offset:offset + RESPONSE_CHUNK_SIZE])
+        
+        print(f"✅ Transcripción completada - {len(segments)} segmentos")
+    
     def log_message(self, format, *args):
         """Personalizar logs del servidor"""
         print(f"🌐 {self.address_string()} - {format % args}")
@@ -370,7 +682,24 @@ class WhisperRequestHandler(http.server.BaseHTTPRequestHandler):
 def run_server():
     """Ejecutar el servidor"""
     try:
-        with socketserver.TCPServer(("", PORT), WhisperRequestHandler) as httpd:
+        # Cargar el modelo por defecto antes de aceptar peticiones
+        get_model(DEFAULT_MODEL)
+        
+        preload_thread = threading.Thread(target=preload_models)
+        preload_thread.daemon = True
+        preload_thread.start()
+        
+        # Iniciar hilos de decodificación y de transcripción
+        for _ in range(DECODE_WORKERS):
+            decode_thread = threading.Thread(target=decode_worker)
+            decode_thread.daemon = True
+            decode_thread.start()
+        
+        worker_thread = threading.Thread(target=transcription_worker)
+        worker_thread.daemon = True
+        worker_thread.start()
+        
+        with http.server.ThreadingHTTPServer(("", PORT), WhisperRequestHandler) as httpd:
             print(f"""
 ╔══════════════════════════════════════╗
 ║     🎵 WHISPER SIMPLE SERVER        ║
@@ -382,7 +711,7 @@ def run_server():
 🔧 Funcionalidades:
    - Transcripción de audio a SRT
    - Interfaz web integrada
-   - Sin dependencias extra (solo Whisper)
+   - Sin dependencias extra (solo faster-whisper)
    
 🎯 Para usar:
    1. Abre http://localhost:{PORT}
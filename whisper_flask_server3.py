@@ -5,161 +5,564 @@ Versión mejorada con modelos más potentes y mejor UX
 """
 
 import http.server
-import socketserver
 import json
 import os
 import tempfile
+import gzip
+import hashlib
 import urllib.parse
 import mimetypes
-import whisper
+import ctranslate2
+import numpy as np
+from faster_whisper import BatchedInferencePipeline, WhisperModel, decode_audio
+from multipart import MultipartSegment, PushMultipartParser, parse_options_header
 import io
 from pathlib import Path
 import threading
 import time
 import queue
+import sched
 import uuid
+import bisect
+import gc
+import logging
+import logging.handlers
+import sys
+from collections import OrderedDict
 from datetime import datetime
 
 # Puerto del servidor
 PORT = 8000
 
-# Cache de modelos Whisper
-model_cache = {}
+# Dispositivo para CTranslate2
+DEVICE = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
 
-# Cola para manejar el progreso de transcripciones
-progress_queue = {}
+def select_compute_type(device):
+    """Elegir la precisión para el dispositivo (float16 en GPU, int8 en CPU)"""
+    override = os.environ.get("WHISPER_COMPUTE_TYPE")
+    if override:
+        return override
+    supported = ctranslate2.get_supported_compute_types(device)
+    preferred = ("float16", "bfloat16", "int8_float16") if device == "cuda" else ("int8", "int8_float32")
+    for compute_type in preferred:
+        if compute_type in supported:
+            return compute_type
+    return "float32"
+
+COMPUTE_TYPE = select_compute_type(DEVICE)
+
+# Tamaño de lote por defecto para decodificar los chunks del VAD en paralelo
+DEFAULT_BATCH_SIZE = 16 if DEVICE == "cuda" else 1
+
+# Modelo que se carga al arrancar y se usa si el formulario no indica otro
+DEFAULT_MODEL = os.environ.get("WHISPER_DEFAULT", "medium")
+
+# Cache LRU de modelos Whisper (WHISPER_MAX_MODELS, por defecto 2)
+MAX_MODELS = int(os.environ.get("WHISPER_MAX_MODELS", "2"))
+model_cache = OrderedDict()
+model_cache_lock = threading.Lock()
+
+# Cola para manejar el progreso de transcripciones, en orden de creación;
+# con más de MAX_TASKS tareas se descartan las más antiguas
+MAX_TASKS = int(os.environ.get("WHISPER_MAX_TASKS", "1000"))
+progress_queue = OrderedDict()
+
+# Avisa a los clientes de /events cuando cambia el progreso de alguna tarea
+progress_changed = threading.Condition()
+
+# Cada cuánto se manda un comentario keep-alive por SSE si no hay cambios
+SSE_KEEPALIVE_SECONDS = 15
+
+# Tamaño de cada trozo al enviar el SRT con Transfer-Encoding: chunked
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Tiempo que se conserva una tarea terminada antes de olvidarla
+TASK_TTL_SECONDS = 1800
+
+def update_progress(task_id, data):
+    """Guardar el progreso de una tarea y despertar a los clientes SSE
+    
+    Al terminar (completada o con error) se programa su expiración en el
+    planificador de limpiezas, que mantiene los vencimientos en un heap.
+    """
+    with progress_changed:
+        progress_queue[task_id] = data
+        while len(progress_queue) > MAX_TASKS:
+            progress_queue.popitem(last=False)
+        progress_changed.notify_all()
+    if data['status'] in ('completed', 'error'):
+        schedule_cleanup(TASK_TTL_SECONDS, expire_task, task_id, data)
+
+def public_progress(task_id, data):
+    """Progreso tal como lo ve el cliente: sin el SRT, con la URL para descargarlo"""
+    if 'result' not in data:
+        return data
+    public = {key: value for key, value in data.items() if key != 'result'}
+    public['download_url'] = f'/download/{task_id}'
+    return public
+
+def get_progress(task_id):
+    """Leer el progreso de una tarea (None si no existe)
+    
+    Cada actualización reemplaza el dict completo y nunca se modifica en
+    sitio, así que la referencia devuelta es una instantánea consistente.
+    """
+    with progress_changed:
+        return progress_queue.get(task_id)
+
+# Tamaño de cada lectura del cuerpo de la petición
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Límite para campos de texto del formulario (no archivos)
+MAX_FIELD_SIZE = 64 * 1024
+
+def warmup_model(model):
+    """Pasar un segundo de silencio para inicializar kernels antes del primer usuario"""
+    silence = np.zeros(SAMPLE_RATE, dtype=np.float32)
+    segments_iter, info = model.transcribe(silence, language="en", beam_size=1)
+    list(segments_iter)
 
 def get_model(model_size):
-    """Obtener modelo desde cache o cargarlo"""
-    if model_size not in model_cache:
-        print(f"📥 Cargando modelo Whisper: {model_size}")
-        model_cache[model_size] = whisper.load_model(model_size)
+    """Obtener pipeline por lotes desde cache o cargar el modelo
+    
+    El modelo por defecto queda fijado y cuenta para WHISPER_MAX_MODELS; solo
+    con un límite de 1 se libera para dejar sitio a otro.
+    """
+    with model_cache_lock:
+        if model_size in model_cache:
+            model_cache.move_to_end(model_size)
+            return model_cache[model_size]
+        
+        # Liberar los modelos menos usados (salvo el fijado) antes de cargar uno nuevo
+        evictable = [size for size in model_cache if MAX_MODELS <= 1 or size != DEFAULT_MODEL]
+        while len(model_cache) >= max(MAX_MODELS, 1) and evictable:
+            evicted_size = evictable.pop(0)
+            model_cache.pop(evicted_size)
+            print(f"🗑️ Liberando modelo {evicted_size}")
+            gc.collect()
+        
+        print(f"📥 Cargando modelo Whisper: {model_size} ({DEVICE}, {COMPUTE_TYPE})")
+        model = WhisperModel(model_size, device=DEVICE, compute_type=COMPUTE_TYPE)
+        warmup_model(model)
+        model_cache[model_size] = BatchedInferencePipeline(model=model)
         print(f"✅ Modelo {model_size} cargado")
-    return model_cache[model_size]
+        return model_cache[model_size]
+
+def is_model_cached(model_size):
+    """Saber si un modelo ya está cargado en la cache"""
+    with model_cache_lock:
+        return model_size in model_cache
+
+def format_timestamps(seconds):
+    """Convierte un array de segundos a marcas de tiempo SRT en una sola pasada"""
+    # Redondear a milisegundos enteros (0.9999s -> 00:00:01,000)
+    total_ms = np.rint(np.asarray(seconds, dtype=np.float64) * 1000).astype(np.int64)
+    hours, rest = np.divmod(total_ms, 3600000)
+    minutes, rest = np.divmod(rest, 60000)
+    secs, milliseconds = np.divmod(rest, 1000)
+    return [
+        "%02d:%02d:%02d,%03d" % parts
+        for parts in zip(hours.tolist(), minutes.tolist(), secs.tolist(), milliseconds.tolist())
+    ]
 
 def format_timestamp(seconds):
     """Convierte segundos a formato SRT"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    milliseconds = int((seconds % 1) * 1000)
-    return f"{hours:02d}:{minutes:02d}:{secs:02d},{milliseconds:03d}"
+    return format_timestamps([seconds])[0]
 
 def create_srt_content(segments, words_per_line=5):
     """Crear contenido SRT con palabras personalizables"""
-    srt_content = []
-    subtitle_index = 1
+    # Aplanar las palabras de todos los segmentos en arrays
+    words = [w for segment in segments for w in segment.get('words', [])]
+    if not words:
+        return ''
+    starts = np.fromiter((w['start'] for w in words), dtype=np.float64, count=len(words))
+    ends = np.fromiter((w['end'] for w in words), dtype=np.float64, count=len(words))
+    tokens = [w['word'].strip() for w in words]
     
-    for segment in segments:
-        if 'words' not in segment:
-            continue
-            
-        words = segment['words']
-        i = 0
-        
-        while i < len(words):
-            line_words = []
-            start_time = words[i]['start']
-            
-            word_count = 0
-            while i < len(words) and word_count < words_per_line:
-                line_words.append(words[i]['word'].strip())
-                word_count += 1
-                i += 1
-            
-            end_time = words[i-1]['end'] if i > 0 else start_time + 0.5
-            
-            text = ' '.join(line_words)
-            start_formatted = format_timestamp(start_time)
-            end_formatted = format_timestamp(end_time)
-            
-            srt_content.append(f"{subtitle_index}")
-            srt_content.append(f"{start_formatted} --> {end_formatted}")
-            srt_content.append(text)
-            srt_content.append("")
-            
-            subtitle_index += 1
+    # Posición de cada palabra dentro de su segmento: una línea empieza cada
+    # words_per_line palabras y nunca cruza un límite de segmento
+    lengths = np.array([len(segment.get('words', [])) for segment in segments], dtype=np.int64)
+    offsets = np.cumsum(lengths) - lengths
+    position = np.arange(len(words)) - np.repeat(offsets, lengths)
+    line_starts = np.flatnonzero(position % words_per_line == 0)
+    line_ends = np.append(line_starts[1:], len(words))
+    
+    start_stamps = format_timestamps(starts[line_starts])
+    end_stamps = format_timestamps(ends[line_ends - 1])
+    
+    # Un bloque por subtítulo; se separan con una línea en blanco
+    buffer = io.StringIO()
+    lines = zip(line_starts.tolist(), line_ends.tolist(), start_stamps, end_stamps)
+    for subtitle_index, (first, last, start, end) in enumerate(lines, 1):
+        if subtitle_index > 1:
+            buffer.write("\n")
+        buffer.write(f"{subtitle_index}\n{start} --> {end}\n{' '.join(tokens[first:last])}\n")
     
-    return '\n'.join(srt_content)
+    return buffer.getvalue()
 
-def transcribe_audio_with_progress(audio_path, model_size, language, words_per_line, task_id):
+def receive_upload(rfile, content_length, boundary, audio_file):
+    """Leer multipart/form-data por bloques de 64 KB
+    
+    El cuerpo del campo "audio" se escribe directamente en audio_file; los demás
+    campos se guardan como texto. Devuelve (campos, bytes_de_audio).
+    """
+    fields = {}
+    audio_size = 0
+    remaining = content_length
+    segment = None
+    value = None
+    
+    with PushMultipartParser(boundary, content_length=content_length) as parser:
+        while not parser.closed:
+            chunk = rfile.read(min(UPLOAD_CHUNK_SIZE, remaining)) if remaining > 0 else b''
+            remaining -= len(chunk)
+            for event in parser.parse(chunk):
+                if isinstance(event, MultipartSegment):
+                    segment = event
+                    value = bytearray()
+                elif event:
+                    if segment.name == 'audio' and segment.filename:
+                        audio_file.write(event)
+                        audio_size += len(event)
+                    elif len(value) + len(event) <= MAX_FIELD_SIZE:
+                        value += event
+                else:
+                    if not segment.filename:
+                        fields[segment.name] = value.decode('utf-8', 'replace').strip()
+                    segment = None
+    
+    return fields, audio_size
+
+def transcribe_audio_with_progress(audio, model_size, language, words_per_line, task_id, batch_size=DEFAULT_BATCH_SIZE):
     """Transcribir audio con seguimiento de progreso"""
     try:
-        # Actualizar progreso: Cargando modelo
-        progress_queue[task_id] = {
-            'status': 'loading_model',
-            'progress': 20,
-            'message': f'Cargando modelo {model_size}...'
-        }
+        # Actualizar progreso: Cargando modelo (se omite si ya está en cache)
+        if not is_model_cached(model_size):
+            update_progress(task_id, {
+                'status': 'loading_model',
+                'progress': 20,
+                'message': f'Cargando modelo {model_size}...'
+            })
         
         model = get_model(model_size)
         
         # Actualizar progreso: Iniciando transcripción
-        progress_queue[task_id] = {
+        update_progress(task_id, {
             'status': 'transcribing',
             'progress': 40,
             'message': 'Iniciando transcripción...'
-        }
+        })
         
-        # Transcribir
-        result = model.transcribe(
-            audio_path,
+        # Transcribir (faster-whisper devuelve un generador perezoso)
+        # El audio ya llega como PCM float32 a 16 kHz
+        segments_iter, info = model.transcribe(
+            audio,
             language=language,
+            batch_size=batch_size,
             word_timestamps=True,
-            verbose=False
+            vad_filter=True,
+            beam_size=5
         )
         
+        segments = []
+        for segment in segments_iter:
+            segments.append({
+                'words': [
+                    {'word': w.word, 'start': w.start, 'end': w.end}
+                    for w in segment.words or []
+                ]
+            })
+            # Avance real según la posición en el audio (40% -> 80%)
+            if info.duration:
+                update_progress(task_id, {
+                    'status': 'transcribing',
+                    'progress': 40 + int(40 * min(segment.end / info.duration, 1.0)),
+                    'message': f'Transcribiendo... {segment.end:.0f}s de {info.duration:.0f}s'
+                })
+        
         # Actualizar progreso: Generando SRT
-        progress_queue[task_id] = {
+        update_progress(task_id, {
             'status': 'generating_srt',
             'progress': 80,
             'message': 'Generando archivo SRT...'
-        }
+        })
         
-        srt_content = create_srt_content(result['segments'], words_per_line)
+        srt_content = create_srt_content(segments, words_per_line)
         
         # Completado
-        progress_queue[task_id] = {
+        update_progress(task_id, {
             'status': 'completed',
             'progress': 100,
             'message': 'Transcripción completada',
             'result': srt_content,
-            'segments_count': len(result['segments']),
-            'detected_language': result.get('language', 'unknown')
-        }
+            'segments_count': len(segments),
+            'detected_language': info.language or 'unknown'
+        })
         
     except Exception as e:
-        progress_queue[task_id] = {
+        update_progress(task_id, {
             'status': 'error',
             'progress': 0,
             'message': f'Error: {str(e)}'
-        }
+        })
 
-class WhisperRequestHandler(http.server.BaseHTTPRequestHandler):
+# Trabajos recibidos, con el audio aún comprimido en su archivo temporal
+job_queue = queue.Queue()
+
+# Trabajos ya decodificados a PCM, consumidos por un único hilo para no competir
+# por la GPU (su tamaño lo limita el presupuesto de muestras, más abajo)
+ready_queue = queue.Queue()
+
+# Trabajos aceptados sin terminar (decodificando, en cola o transcribiéndose);
+# al llegar al límite se responde 503 en lugar de acumular peticiones
+MAX_PENDING_JOBS = 16
+pending_jobs = threading.BoundedSemaphore(MAX_PENDING_JOBS)
+
+# Micro-lotes entre peticiones: hasta MAX_BATCH trabajos o MAX_WAIT_MS de espera
+MAX_BATCH = 8
+MAX_WAIT_MS = 100
+
+# Frecuencia de muestreo de Whisper
+SAMPLE_RATE = 16000
+
+# Presupuesto de audio decodificado en espera o en transcripción, en muestras
+# (WHISPER_MAX_READY_SECONDS, por defecto 1 h ≈ 230 MB de float32). Se limita
+# por duración y no por número de trabajos: muchos archivos cortos caben en un
+# mismo lote y unos pocos archivos largos no agotan la memoria
+MAX_READY_SAMPLES = int(float(os.environ.get("WHISPER_MAX_READY_SECONDS", "3600")) * SAMPLE_RATE)
+ready_budget = threading.Condition()
+ready_samples = 0
+
+def reserve_ready(samples):
+    """Esperar hasta que quepa un audio más en el presupuesto y reservarlo
     
-    def do_GET(self):
-        """Manejar peticiones GET"""
-        if self.path == '/':
-            self.serve_html()
-        elif self.path == '/health':
-            self.serve_health()
-        elif self.path.startswith('/progress/'):
-            self.serve_progress()
-        elif self.path.startswith('/download/'):
-            self.serve_download()
-        else:
-            self.send_error(404, "Página no encontrada")
+    Con el presupuesto vacío siempre se admite, aunque el archivo sea más largo.
+    """
+    global ready_samples
+    with ready_budget:
+        ready_budget.wait_for(lambda: ready_samples == 0 or ready_samples + samples <= MAX_READY_SAMPLES)
+        ready_samples += samples
+
+def release_ready(samples):
+    """Devolver al presupuesto las muestras de audios ya transcritos"""
+    global ready_samples
+    with ready_budget:
+        ready_samples -= samples
+        ready_budget.notify_all()
+
+# Silencio entre archivos agrupados: el VAD une los tramos de voz en ventanas
+# de hasta 30 s sin mirar los silencios, así que el hueco debe superar esa
+# ventana (más el relleno del VAD) para que ningún chunk mezcle dos archivos
+VAD_CHUNK_SECONDS = 30
+BATCH_GAP_SECONDS = VAD_CHUNK_SECONDS + 2.0
+
+# Hilos que decodifican el audio a PCM antes de pasarlo a la GPU
+DECODE_WORKERS = int(os.environ.get("WHISPER_WORKERS", "1"))
+
+# Un archivo se considera silencio si ninguna ventana de 1 s supera este RMS
+# (sin componente continua); así una charla con muchas pausas o grabada con
+# poca ganancia no se descarta por su media global
+SILENCE_RMS_THRESHOLD = 0.01
+SILENCE_WINDOW_SECONDS = 1
+
+def window_rms(frames):
+    """RMS sin componente continua de cada fila, sin copias del tamaño del audio"""
+    length = frames.shape[1]
+    means = frames.sum(axis=1, dtype=np.float64) / length
+    squares = np.einsum('ij,ij->i', frames, frames, dtype=np.float64) / length
+    return np.sqrt(np.maximum(squares - means * means, 0.0))
+
+def is_silent(audio):
+    """Comprobar si el audio es silencio o casi en todas sus ventanas de 1 s"""
+    if audio.size == 0:
+        return True
+    window = SILENCE_WINDOW_SECONDS * SAMPLE_RATE
+    full = len(audio) // window * window
+    if full:
+        frames = audio[:full].reshape(-1, window)
+        if window_rms(frames).max() >= SILENCE_RMS_THRESHOLD:
+            return False
+    if full < len(audio):
+        if window_rms(audio[full:].reshape(1, -1))[0] >= SILENCE_RMS_THRESHOLD:
+            return False
+    return True
+
+def decode_job(job):
+    """Decodificar el archivo subido una sola vez y pasar el trabajo con el PCM
     
-    def do_POST(self):
-        """Manejar peticiones POST"""
-        if self.path == '/transcribe':
-            self.handle_transcribe()
-        else:
-            self.send_error(404, "Endpoint no encontrado")
+    El hilo de transcripción recibe directamente el array float32 a 16 kHz y el
+    archivo temporal se borra en cuanto deja de hacer falta.
+    """
+    task_id = job['task_id']
+    audio_path = job.pop('audio_path')
+    try:
+        update_progress(task_id, {
+            'status': 'decoding',
+            'progress': 12,
+            'message': 'Decodificando audio...'
+        })
+        job['audio'] = decode_audio(audio_path, sampling_rate=SAMPLE_RATE)
+    except Exception as e:
+        update_progress(task_id, {
+            'status': 'error',
+            'progress': 0,
+            'message': f'Error al decodificar el audio: {str(e)}'
+        })
+        pending_jobs.release()
+        return
+    finally:
+        remove_temp_file(audio_path)
     
-    def serve_html(self):
-        """Servir la página HTML principal con diseño moderno"""
-        html_content = '''<!DOCTYPE html>
+    # Un archivo en silencio no necesita pasar por Whisper
+    if is_silent(job['audio']):
+        update_progress(task_id, {
+            'status': 'completed',
+            'progress': 100,
+            'message': 'El audio está en silencio',
+            'result': '',
+            'segments_count': 0,
+            'detected_language': 'silence'
+        })
+        pending_jobs.release()
+        return
+    
+    # Encolar para el hilo de transcripción (puede agruparse con otras peticiones)
+    update_progress(task_id, {
+        'status': 'queued',
+        'progress': 15,
+        'message': 'En cola para transcripción...'
+    })
+    # Se bloquea mientras el audio en espera supere el presupuesto
+    reserve_ready(len(job['audio']))
+    ready_queue.put(job)
+
+def decode_worker():
+    """Decodificar los trabajos recibidos por orden de llegada"""
+    while True:
+        decode_job(job_queue.get())
+
+def transcribe_group_with_progress(jobs):
+    """Transcribir varios archivos compatibles en una sola pasada por lotes
+    
+    Los audios se concatenan separados por silencio para que los chunks del VAD
+    de todas las peticiones compartan lotes; luego cada palabra se devuelve a
+    su tarea según el desplazamiento de su archivo.
+    """
+    first = jobs[0]
+    try:
+        if not is_model_cached(first['model_size']):
+            for job in jobs:
+                update_progress(job['task_id'], {
+                    'status': 'loading_model',
+                    'progress': 20,
+                    'message': f"Cargando modelo {first['model_size']}..."
+                })
+        
+        model = get_model(first['model_size'])
+        
+        gap = np.zeros(int(BATCH_GAP_SECONDS * SAMPLE_RATE), dtype=np.float32)
+        pieces = []
+        offsets = []
+        position = 0
+        for job in jobs:
+            audio = job.pop('audio')
+            offsets.append(position / SAMPLE_RATE)
+            pieces.append(audio)
+            pieces.append(gap)
+            position += len(audio) + len(gap)
+        # Tras concatenar solo queda la copia conjunta en memoria
+        audio = np.concatenate(pieces)
+        del pieces
+        
+        for job in jobs:
+            update_progress(job['task_id'], {
+                'status': 'transcribing',
+                'progress': 40,
+                'message': f'Iniciando transcripción (lote de {len(jobs)} archivos)...'
+            })
+        
+        segments_iter, info = model.transcribe(
+            audio,
+            language=first['language'],
+            batch_size=first['batch_size'],
+            word_timestamps=True,
+            vad_filter=True,
+            beam_size=5
+        )
+        
+        per_job = [[] for _ in jobs]
+        for segment in segments_iter:
+            buckets = {}
+            for w in segment.words or []:
+                index = bisect.bisect_right(offsets, w.start) - 1
+                offset = offsets[index]
+                buckets.setdefault(index, []).append(
+                    {'word': w.word, 'start': w.start - offset, 'end': w.end - offset}
+                )
+            for index, words in buckets.items():
+                per_job[index].append({'words': words})
+            
+            if info.duration:
+                for job in jobs:
+                    update_progress(job['task_id'], {
+                        'status': 'transcribing',
+                        'progress': 40 + int(40 * min(segment.end / info.duration, 1.0)),
+                        'message': f'Transcribiendo lote... {segment.end:.0f}s de {info.duration:.0f}s'
+                    })
+        
+        for job, segments in zip(jobs, per_job):
+            update_progress(job['task_id'], {
+                'status': 'completed',
+                'progress': 100,
+                'message': 'Transcripción completada',
+                'result': create_srt_content(segments, job['words_per_line']),
+                'segments_count': len(segments),
+                'detected_language': first['language']
+            })
+    
+    except Exception as e:
+        for job in jobs:
+            update_progress(job['task_id'], {
+                'status': 'error',
+                'progress': 0,
+                'message': f'Error: {str(e)}'
+            })
+
+def transcription_worker():
+    """Agrupar trabajos recibidos en una ventana corta y procesarlos por lotes"""
+    while True:
+        jobs = [ready_queue.get()]
+        deadline = time.monotonic() + MAX_WAIT_MS / 1000
+        while len(jobs) < MAX_BATCH:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                jobs.append(ready_queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        
+        # Con auto-detección cada archivo necesita su propio idioma
+        groups = {}
+        for job in jobs:
+            if job['language']:
+                key = (job['model_size'], job['language'], job['batch_size'])
+            else:
+                key = job['task_id']
+            groups.setdefault(key, []).append(job)
+        
+        for group in groups.values():
+            samples = sum(len(job['audio']) for job in group)
+            if len(group) == 1:
+                transcribe_audio_with_progress(**group[0])
+            else:
+                transcribe_group_with_progress(group)
+            release_ready(samples)
+            for _ in group:
+                pending_jobs.release()
+
+# Página principal, codificada y comprimida una sola vez al importar el módulo
+HTML_CONTENT = '''<!DOCTYPE html>
 <html>
 <head>
     <title>Whisper AI Transcriptor</title>
@@ -473,6 +876,11 @@ class WhisperRequestHandler(http.server.BaseHTTPRequestHandler):
                     <input type="number" id="wordsPerLine" value="6" min="1" max="25">
                 </div>
                 
+                <div class="form-group">
+                    <label><i class="fas fa-layer-group"></i> Tamaño de lote</label>
+                    <input type="number" id="batchSize" placeholder="Automático" min="1" max="64">
+                </div>
+                
                 <div class="form-group">
                     <label><i class="fas fa-language"></i> Idioma</label>
                     <select id="language">
@@ -564,6 +972,7 @@ class WhisperRequestHandler(http.server.BaseHTTPRequestHandler):
     <script>
         let currentTaskId = null;
         let progressInterval = null;
+        let progressEvents = null;
         let selectedModel = 'medium';
         
         // Elementos del DOM
@@ -606,27 +1015,54 @@ class WhisperRequestHandler(http.server.BaseHTTPRequestHandler):
             log(data.message);
         }
         
-        // Verificar progreso
+        // Procesar un estado de progreso recibido del servidor
+        function handleProgress(data) {
+            updateProgress(data);
+            
+            if (data.status === 'completed') {
+                stopProgress();
+                showResult(data);
+            } else if (data.status === 'error') {
+                stopProgress();
+                log(data.message, 'error');
+                resetForm();
+            }
+        }
+        
+        function stopProgress() {
+            clearInterval(progressInterval);
+            if (progressEvents) {
+                progressEvents.close();
+                progressEvents = null;
+            }
+        }
+        
+        // Verificar progreso (respaldo si no hay EventSource)
         function checkProgress(taskId) {
             fetch(`/progress/${taskId}`)
                 .then(response => response.json())
-                .then(data => {
-                    updateProgress(data);
-                    
-                    if (data.status === 'completed') {
-                        clearInterval(progressInterval);
-                        showResult(data);
-                    } else if (data.status === 'error') {
-                        clearInterval(progressInterval);
-                        log(data.message, 'error');
-                        resetForm();
-                    }
-                })
+                .then(handleProgress)
                 .catch(error => {
                     log('Error verificando progreso: ' + error.message, 'error');
                 });
         }
         
+        // Recibir el progreso por Server-Sent Events, o sondear cada segundo
+        function watchProgress(taskId) {
+            if (!window.EventSource) {
+                progressInterval = setInterval(() => checkProgress(taskId), 1000);
+                return;
+            }
+            progressEvents = new EventSource(`/events/${taskId}`);
+            progressEvents.onmessage = event => handleProgress(JSON.parse(event.data));
+            progressEvents.onerror = () => {
+                if (!progressEvents) return;
+                progressEvents.close();
+                progressEvents = null;
+                progressInterval = setInterval(() => checkProgress(taskId), 1000);
+            };
+        }
+        
         // Mostrar resultado
         function showResult(data) {
             progressSection.style.display = 'none';
@@ -636,19 +1072,33 @@ class WhisperRequestHandler(http.server.BaseHTTPRequestHandler):
             document.getElementById('detectedLanguage').textContent = `Detectado: ${data.detected_language}`;
             
             const downloadBtn = document.getElementById('downloadBtn');
-            downloadBtn.onclick = () => {
-                const blob = new Blob([data.result], { type: 'text/plain' });
-                const url = URL.createObjectURL(blob);
-                const a = document.createElement('a');
-                a.href = url;
-                const filename = document.getElementById('audioFile').files[0].name.replace(/\\.[^/.]+$/, "") + '.srt';
-                a.download = filename;
-                document.body.appendChild(a);
-                a.click();
-                document.body.removeChild(a);
-                URL.revokeObjectURL(url);
-                log('Archivo descargado: ' + filename, 'info');
-            };
+            const filename = document.getElementById('audioFile').files[0].name.replace(/\\.[^/.]+$/, "") + '.srt';
+            downloadBtn.disabled = true;
+            downloadBtn.onclick = null;
+            
+            // Traer el SRT una sola vez: la tarea expira en el servidor, pero el
+            // Blob queda en la página para descargarlo cuando se quiera
+            fetch(data.download_url)
+                .then(response => {
+                    if (!response.ok) {
+                        throw new Error(`HTTP ${response.status}`);
+                    }
+                    return response.blob();
+                })
+                .then(blob => {
+                    const url = URL.createObjectURL(blob);
+                    downloadBtn.disabled = false;
+                    downloadBtn.onclick = () => {
+                        const a = document.createElement('a');
+                        a.href = url;
+                        a.download = filename;
+                        document.body.appendChild(a);
+                        a.click();
+                        document.body.removeChild(a);
+                        log('Archivo descargado: ' + filename, 'info');
+                    };
+                })
+                .catch(error => log('No se pudo obtener el SRT: ' + error.message, 'error'));
             
             resetForm();
         }
@@ -687,6 +1137,7 @@ class WhisperRequestHandler(http.server.BaseHTTPRequestHandler):
             formData.append('audio', file);
             formData.append('words_per_line', document.getElementById('wordsPerLine').value);
             formData.append('model_size', selectedModel);
+            formData.append('batch_size', document.getElementById('batchSize').value);
             formData.append('language', document.getElementById('language').value);
             formData.append('task_id', currentTaskId);
             
@@ -701,10 +1152,8 @@ class WhisperRequestHandler(http.server.BaseHTTPRequestHandler):
                     throw new Error('Error en el servidor');
                 }
                 
-                // Iniciar verificación de progreso
-                progressInterval = setInterval(() => {
-                    checkProgress(currentTaskId);
-                }, 1000);
+                // Iniciar seguimiento del progreso
+                watchProgress(currentTaskId);
                 
             } catch (error) {
                 log('Error: ' + error.message, 'error');
@@ -719,39 +1168,258 @@ class WhisperRequestHandler(http.server.BaseHTTPRequestHandler):
     </script>
 </body>
 </html>'''
+HTML_BYTES = HTML_CONTENT.encode('utf-8')
+HTML_GZIP = gzip.compress(HTML_BYTES, compresslevel=6)
+# Validadores fuertes distintos para cada codificación
+HTML_ETAG = '"%s"' % hashlib.md5(HTML_BYTES).hexdigest()
+HTML_GZIP_ETAG = '"%s-gz"' % hashlib.md5(HTML_BYTES).hexdigest()
+
+# Un único codificador JSON compacto para todas las respuestas
+JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+def encode_json(data):
+    """Codificar un objeto como JSON UTF-8"""
+    return JSON_ENCODER.encode(data).encode('utf-8')
+
+# Respuesta fija del endpoint de salud
+HEALTH_BYTES = encode_json({"status": "ok", "message": "Servidor funcionando"})
+
+# Cabeceras fijas armadas una sola vez; cada respuesta sale en una única escritura
+JSON_RESPONSE_HEAD = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: application/json\r\n"
+    b"Content-Length: %d\r\n"
+    b"Access-Control-Allow-Origin: *\r\n"
+    b"\r\n"
+)
+
+HEALTH_RESPONSE = JSON_RESPONSE_HEAD % len(HEALTH_BYTES) + HEALTH_BYTES
+
+# Cabeceras de caché comunes a las respuestas 200 y 304 de la página
+HTML_CACHE_HEADERS = (
+    ('Vary', 'Accept-Encoding'),
+    ('Cache-Control', 'public, max-age=3600'),
+)
+
+def build_html_response(body, etag, extra_headers=b""):
+    """Respuesta completa de la página con sus cabeceras de caché"""
+    return b"".join([
+        b"HTTP/1.1 200 OK\r\n",
+        b"Content-Type: text/html; charset=utf-8\r\n",
+        b"Content-Length: %d\r\n" % len(body),
+        extra_headers,
+        *[f"{name}: {value}\r\n".encode('ascii') for name, value in HTML_CACHE_HEADERS],
+        b"ETag: %s\r\n" % etag.encode('ascii'),
+        b"\r\n",
+        body,
+    ])
+
+HTML_RESPONSE = build_html_response(HTML_BYTES, HTML_ETAG)
+HTML_GZIP_RESPONSE = build_html_response(HTML_GZIP, HTML_GZIP_ETAG, b"Content-Encoding: gzip\r\n")
+
+class RawQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que encola el registro sin formatear
+    
+    El QueueHandler estándar formatea el mensaje en el hilo que registra; los
+    argumentos de los logs de acceso son cadenas y números inmutables, así que
+    el formateo puede hacerse más tarde en el hilo del listener.
+    """
+    
+    def prepare(self, record):
+        return record
+
+# Los hilos de petición solo encolan sus logs; un hilo aparte los formatea y escribe
+access_log_queue = queue.SimpleQueue()
+access_logger = logging.getLogger("whisper.access")
+access_logger.setLevel(logging.INFO)
+access_logger.propagate = False
+access_logger.addHandler(RawQueueHandler(access_log_queue))
+access_log_listener = logging.handlers.QueueListener(access_log_queue, logging.StreamHandler(sys.stdout))
+
+class WhisperRequestHandler(http.server.BaseHTTPRequestHandler):
+    # HTTP/1.1 para poder usar Transfer-Encoding: chunked en /download
+    protocol_version = "HTTP/1.1"
+    
+    # Salida con búfer: cabeceras y cuerpo salen juntos en un solo send() al
+    # terminar cada petición; los flujos SSE vacían el búfer en cada evento
+    wbufsize = 64 * 1024
+    
+    # TCP_NODELAY: las respuestas pequeñas (progreso, SSE) no esperan a Nagle
+    disable_nagle_algorithm = True
+    
+    def handle_expect_100(self):
+        """Enviar el 100 Continue en el acto: con búfer se quedaría retenido"""
+        result = super().handle_expect_100()
+        self.wfile.flush()
+        return result
+    
+    def do_GET(self):
+        """Manejar peticiones GET"""
+        if self.path == '/':
+            self.serve_html()
+        elif self.path == '/health':
+            self.serve_health()
+        elif self.path.startswith('/progress/'):
+            self.serve_progress()
+        elif self.path.startswith('/progress?'):
+            self.serve_progress_batch()
+        elif self.path.startswith('/events/'):
+            self.serve_events()
+        elif self.path.startswith('/download/'):
+            self.serve_download()
+        else:
+            self.send_error(404, "Página no encontrada")
+    
+    def do_POST(self):
+        """Manejar peticiones POST"""
+        if self.path == '/transcribe':
+            self.handle_transcribe()
+        else:
+            self.send_error(404, "Endpoint no encontrado")
+    
+    def serve_html(self):
+        """Servir la página HTML principal con diseño moderno"""
+        # If-None-Match admite varias etiquetas y comparación débil (W/)
+        requested = {
+            tag.strip().removeprefix('W/')
+            for tag in self.headers.get('If-None-Match', '').split(',')
+        }
+        for etag in (HTML_ETAG, HTML_GZIP_ETAG):
+            if etag in requested:
+                self.send_response(304)
+                for name, value in HTML_CACHE_HEADERS:
+                    self.send_header(name, value)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
         
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html; charset=utf-8')
-        self.end_headers()
-        self.wfile.write(html_content.encode('utf-8'))
+        # Versión comprimida si el navegador la acepta
+        self.log_request(200)
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            self.wfile.write(HTML_GZIP_RESPONSE)
+        else:
+            self.wfile.write(HTML_RESPONSE)
+    
+    def send_json(self, data):
+        """Enviar una respuesta JSON con su longitud"""
+        self.send_json_bytes(encode_json(data))
+    
+    def send_json_bytes(self, body):
+        """Enviar un cuerpo JSON ya codificado con cabeceras y cuerpo en una escritura"""
+        self.log_request(200)
+        self.wfile.write(JSON_RESPONSE_HEAD % len(body) + body)
     
     def serve_health(self):
         """Endpoint de salud"""
-        response = {"status": "ok", "message": "Servidor funcionando"}
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        self.wfile.write(json.dumps(response).encode('utf-8'))
+        self.log_request(200)
+        self.wfile.write(HEALTH_RESPONSE)
     
     def serve_progress(self):
         """Servir el progreso de una transcripción"""
         task_id = self.path.split('/')[-1]
         
-        if task_id in progress_queue:
-            progress_data = progress_queue[task_id]
-        else:
+        progress_data = get_progress(task_id)
+        if progress_data is None:
             progress_data = {
                 'status': 'not_found',
                 'progress': 0,
                 'message': 'Tarea no encontrada'
             }
         
+        self.send_json(public_progress(task_id, progress_data))
+    
+    def serve_progress_batch(self):
+        """Servir el progreso de varias tareas en una sola respuesta (?ids=a,b,c)"""
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        task_ids = [task_id for value in query.get('ids', []) for task_id in value.split(',') if task_id]
+        
+        with progress_changed:
+            snapshot = {task_id: progress_queue.get(task_id) for task_id in task_ids}
+        
+        response = {}
+        for task_id, progress_data in snapshot.items():
+            if progress_data is None:
+                progress_data = {
+                    'status': 'not_found',
+                    'progress': 0,
+                    'message': 'Tarea no encontrada'
+                }
+            response[task_id] = public_progress(task_id, progress_data)
+        
+        self.send_json(response)
+    
+    def serve_download(self):
+        """Enviar el SRT de una tarea completada con Transfer-Encoding: chunked"""
+        task_id = self.path.split('/')[-1]
+        
+        progress_data = get_progress(task_id)
+        if progress_data is None or 'result' not in progress_data:
+            self.send_error(404, "Transcripción no disponible")
+            return
+        
+        srt_bytes = memoryview(progress_data['result'].encode('utf-8'))
+        
         self.send_response(200)
-        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Disposition', 'attachment; filename="transcription.srt"')
+        self.send_header('Transfer-Encoding', 'chunked')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.end_headers()
-        self.wfile.write(json.dumps(progress_data).encode('utf-8'))
+        
+        # Enmarcar todos los trozos en un único buffer: una sola escritura en
+        # lugar de tres por trozo
+        frames = []
+        for offset in range(0, len(srt_bytes), DOWNLOAD_CHUNK_SIZE):
+            piece = srt_bytes[offset:offset + DOWNLOAD_CHUNK_SIZE]
+            frames.append(b"%x\r\n" % len(piece))
+            frames.append(piece)
+            frames.append(b"\r\n")
+        frames.append(b"0\r\n\r\n")
+        self.wfile.write(b"".join(frames))
+    
+    def serve_events(self):
+        """Enviar el progreso de una tarea por Server-Sent Events hasta que termine"""
+        task_id = self.path.split('/')[-1]
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        # El flujo no tiene longitud: la conexión se cierra al terminar
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        
+        # Centinela para que la primera lectura siempre se envíe
+        last_sent = object()
+        try:
+            while True:
+                with progress_changed:
+                    progress_changed.wait_for(
+                        lambda: progress_queue.get(task_id) is not last_sent,
+                        timeout=SSE_KEEPALIVE_SECONDS
+                    )
+                    progress_data = progress_queue.get(task_id)
+                
+                if progress_data is last_sent:
+                    self.wfile.write(b': keep-alive\n\n')
+                    self.wfile.flush()
+                    continue
+                
+                if progress_data is None:
+                    progress_data = {
+                        'status': 'not_found',
+                        'progress': 0,
+                        'message': 'Tarea no encontrada'
+                    }
+                
+                self.wfile.write(b"data: " + encode_json(public_progress(task_id, progress_data)) + b"\n\n")
+                self.wfile.flush()
+                last_sent = progress_data
+                
+                if progress_data['status'] in ('completed', 'error', 'not_found'):
+                    break
+        except ConnectionError:  # incluye ConnectionAbortedError (Windows)
+            pass
     
     def handle_transcribe(self):
         """Manejar la transcripción de audio de forma asíncrona"""
@@ -762,103 +1430,68 @@ class WhisperRequestHandler(http.server.BaseHTTPRequestHandler):
                 self.send_error(400, "No hay contenido")
                 return
             
-            # Leer los datos
-            post_data = self.rfile.read(content_length)
+            # Parsear multipart/form-data por bloques
+            content_type, options = parse_options_header(self.headers.get('Content-Type', ''))
+            boundary = options.get('boundary')
             
-            # Parsear multipart/form-data
-            boundary = None
-            content_type = self.headers.get('Content-Type', '')
-            if 'boundary=' in content_type:
-                boundary = content_type.split('boundary=')[1].encode()
-            
-            if not boundary:
+            if content_type != 'multipart/form-data' or not boundary:
                 self.send_error(400, "Boundary no encontrado")
                 return
             
-            # Extraer archivo y parámetros
-            parts = post_data.split(b'--' + boundary)
-            
-            audio_data = None
-            words_per_line = 6
-            model_size = 'medium'
-            language = None
-            task_id = str(uuid.uuid4())
-            
-            for part in parts:
-                if b'Content-Disposition: form-data' in part:
-                    if b'name="audio"' in part and b'filename=' in part:
-                        header_end = part.find(b'\r\n\r\n')
-                        if header_end != -1:
-                            audio_data = part[header_end + 4:]
-                            if audio_data.endswith(b'\r\n'):
-                                audio_data = audio_data[:-2]
-                    
-                    elif b'name="words_per_line"' in part:
-                        header_end = part.find(b'\r\n\r\n')
-                        if header_end != -1:
-                            value = part[header_end + 4:].decode().strip()
-                            words_per_line = int(value) if value.isdigit() else 6
-                    
-                    elif b'name="model_size"' in part:
-                        header_end = part.find(b'\r\n\r\n')
-                        if header_end != -1:
-                            model_size = part[header_end + 4:].decode().strip()
-                    
-                    elif b'name="language"' in part:
-                        header_end = part.find(b'\r\n\r\n')
-                        if header_end != -1:
-                            lang = part[header_end + 4:].decode().strip()
-                            if lang != 'auto':
-                                language = lang
-                    
-                    elif b'name="task_id"' in part:
-                        header_end = part.find(b'\r\n\r\n')
-                        if header_end != -1:
-                            task_id = part[header_end + 4:].decode().strip()
-            
-            if not audio_data:
+            # El audio se escribe en disco a medida que llega
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.tmp') as temp_file:
+                temp_path = temp_file.name
+                try:
+                    fields, audio_size = receive_upload(self.rfile, content_length, boundary, temp_file)
+                except Exception:
+                    temp_file.close()
+                    os.unlink(temp_path)
+                    raise
+            
+            if not audio_size:
+                os.unlink(temp_path)
                 self.send_error(400, "Archivo de audio no encontrado")
                 return
             
-            print(f"📁 Procesando archivo ({len(audio_data)} bytes) - ID: {task_id}")
-            print(f"⚙️ Modelo: {model_size}, Idioma: {language or 'auto'}")
+            value = fields.get('words_per_line', '')
+            words_per_line = max(int(value), 1) if value.isdigit() else 6
+            
+            model_size = fields.get('model_size') or DEFAULT_MODEL
+            
+            value = fields.get('batch_size', '')
+            batch_size = int(value) if value.isdigit() and int(value) > 0 else DEFAULT_BATCH_SIZE
             
-            # Inicializar progreso
-            progress_queue[task_id] = {
+            language = fields.get('language') or None
+            if language == 'auto':
+                language = None
+            
+            task_id = fields.get('task_id') or str(uuid.uuid4())
+            
+            print(f"📁 Procesando archivo ({audio_size} bytes) - ID: {task_id}")
+            print(f"⚙️ Modelo: {model_size}, Idioma: {language or 'auto'}, Lote: {batch_size}")
+            
+            if not pending_jobs.acquire(blocking=False):
+                os.unlink(temp_path)
+                self.send_error(503, "Servidor ocupado, intenta más tarde")
+                return
+            
+            # Inicializar progreso (solo para trabajos aceptados: la expiración
+            # se programa cuando terminan)
+            update_progress(task_id, {
                 'status': 'uploading',
                 'progress': 10,
                 'message': 'Archivo recibido, preparando...'
-            }
-            
-            # Guardar archivo temporal
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.tmp') as temp_file:
-                temp_file.write(audio_data)
-                temp_path = temp_file.name
+            })
             
-            # Iniciar transcripción en hilo separado
-            thread = threading.Thread(
-                target=transcribe_audio_with_progress,
-                args=(temp_path, model_size, language, words_per_line, task_id)
-            )
-            thread.daemon = True
-            thread.start()
-            
-            # Limpiar archivo temporal después de un tiempo
-            def cleanup_temp_file():
-                time.sleep(300)  # 5 minutos
-                try:
-                    if os.path.exists(temp_path):
-                        os.unlink(temp_path)
-                    # Limpiar progreso después de 10 minutos
-                    time.sleep(300)
-                    if task_id in progress_queue:
-                        del progress_queue[task_id]
-                except:
-                    pass
-            
-            cleanup_thread = threading.Thread(target=cleanup_temp_file)
-            cleanup_thread.daemon = True
-            cleanup_thread.start()
+            # Encolar con la ruta: se decodifica justo antes de transcribirlo
+            job_queue.put({
+                'audio_path': temp_path,
+                'model_size': model_size,
+                'language': language,
+                'words_per_line': words_per_line,
+                'task_id': task_id,
+                'batch_size': batch_size
+            })
             
             # Responder inmediatamente con el task_id
             response = {
@@ -867,11 +1500,7 @@ class WhisperRequestHandler(http.server.BaseHTTPRequestHandler):
                 'message': 'Transcripción iniciada'
             }
             
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(response).encode('utf-8'))
+            self.send_json(response)
             
         except Exception as e:
             print(f"❌ Error: {str(e)}")
@@ -879,39 +1508,75 @@ class WhisperRequestHandler(http.server.BaseHTTPRequestHandler):
     
     def log_message(self, format, *args):
         """Personalizar logs del servidor"""
-        print(f"🌐 {self.address_string()} - {format % args}")
+        access_logger.info("🌐 %s - " + format, self.address_string(), *args)
 
-def cleanup_old_tasks():
-    """Limpiar tareas antiguas periódicamente"""
-    while True:
-        time.sleep(600)  # Cada 10 minutos
-        current_time = time.time()
-        tasks_to_remove = []
-        
-        for task_id in progress_queue:
-            # Si la tarea tiene más de 30 minutos, eliminarla
-            try:
-                task_time = int(task_id.split('_')[0]) / 1000 if '_' in task_id else int(task_id) / 1000
-                if current_time - task_time > 1800:  # 30 minutos
-                    tasks_to_remove.append(task_id)
-            except:
-                continue
-        
-        for task_id in tasks_to_remove:
+# Un único hilo ejecuta todas las limpiezas diferidas (reloj monotónico)
+cleanup_wakeup = threading.Event()
+cleanup_stop = threading.Event()
+
+def wait_for_cleanup(timeout):
+    """Dormir hasta la próxima limpieza o hasta que se programe una nueva"""
+    cleanup_wakeup.wait(timeout)
+    cleanup_wakeup.clear()
+
+cleanup_scheduler = sched.scheduler(time.monotonic, wait_for_cleanup)
+
+def schedule_cleanup(delay, action, *args):
+    """Programar una limpieza diferida en el planificador compartido"""
+    cleanup_scheduler.enter(delay, 1, action, args)
+    cleanup_wakeup.set()
+
+def remove_temp_file(temp_path):
+    """Borrar un archivo temporal si todavía existe"""
+    try:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+    except OSError:
+        pass
+
+def expire_task(task_id, data):
+    """Olvidar el progreso de una tarea si no ha cambiado desde que terminó"""
+    with progress_changed:
+        if progress_queue.get(task_id) is data:
             del progress_queue[task_id]
-            
-        if tasks_to_remove:
-            print(f"🧹 Limpieza: {len(tasks_to_remove)} tareas antiguas eliminadas")
+
+def run_cleanup_scheduler():
+    """Ejecutar las limpiezas programadas hasta que se pida parar"""
+    while not cleanup_stop.is_set():
+        # Segundos hasta la próxima limpieza, o None si no hay ninguna
+        delay = cleanup_scheduler.run(blocking=False)
+        wait_for_cleanup(delay)
+
+def stop_cleanup_scheduler():
+    """Despertar al hilo de limpieza para que termine"""
+    cleanup_stop.set()
+    cleanup_wakeup.set()
 
 def run_server():
     """Ejecutar el servidor"""
     try:
+        # Iniciar hilo de logs de acceso
+        access_log_listener.start()
+        
         # Iniciar hilo de limpieza
-        cleanup_thread = threading.Thread(target=cleanup_old_tasks)
-        cleanup_thread.daemon = True
-        cleanup_thread.start()
+        scheduler_thread = threading.Thread(target=run_cleanup_scheduler)
+        scheduler_thread.daemon = True
+        scheduler_thread.start()
+        
+        # Cargar y calentar el modelo por defecto antes de aceptar peticiones
+        get_model(DEFAULT_MODEL)
+        
+        # Iniciar hilos de decodificación y de transcripción
+        for _ in range(max(DECODE_WORKERS, 1)):
+            decode_thread = threading.Thread(target=decode_worker)
+            decode_thread.daemon = True
+            decode_thread.start()
+        
+        worker_thread = threading.Thread(target=transcription_worker)
+        worker_thread.daemon = True
+        worker_thread.start()
         
-        with socketserver.TCPServer(("", PORT), WhisperRequestHandler) as httpd:
+        with http.server.ThreadingHTTPServer(("", PORT), WhisperRequestHandler) as httpd:
             print(f"""
 ╔══════════════════════════════════════════════════════╗
 ║          🎵 WHISPER AI TRANSCRIPTOR AVANZADO         ║
@@ -944,6 +1609,9 @@ def run_server():
    • /          - Interfaz web
    • /transcribe - Transcripción de audio
    • /progress/[id] - Estado del progreso
+   • /progress?ids=a,b - Progreso de varias tareas
+   • /events/[id] - Progreso en vivo (SSE)
+   • /download/[id] - Descarga del SRT
    • /health    - Estado del servidor
 
 ⏹️  Para detener: Ctrl+C
@@ -951,11 +1619,15 @@ def run_server():
             httpd.serve_forever()
             
     except KeyboardInterrupt:
+        stop_cleanup_scheduler()
+        access_log_listener.stop()
         print(f"\n⏹️  Servidor detenido por el usuario")
         print("🧹 Limpiando recursos...")
         # Limpiar cache de modelos si es necesario
-        model_cache.clear()
-        progress_queue.clear()
+        with model_cache_lock:
+            model_cache.clear()
+        with progress_changed:
+            progress_queue.clear()
         print("✅ Limpieza completada")
         
     except Exception as e:
@@ -963,17 +1635,17 @@ def run_server():
         print("💡 Posibles soluciones:")
         print(f"   • Verificar que el puerto {PORT} esté libre")
         print("   • Ejecutar con permisos de administrador")
-        print("   • Instalar dependencias: pip install openai-whisper")
+        print("   • Instalar dependencias: pip install faster-whisper")
 
 if __name__ == "__main__":
-    # Verificar que Whisper esté instalado
+    # Verificar que faster-whisper esté instalado
     try:
-        import whisper
-        print("✅ OpenAI Whisper detectado")
+        import faster_whisper
+        print("✅ faster-whisper detectado")
     except ImportError:
-        print("❌ OpenAI Whisper no está instalado")
-        print("📦 Instalar con: pip install openai-whisper")
-        print("🔗 Más info: https://github.com/openai/whisper")
+        print("❌ faster-whisper no está instalado")
+        print("📦 Instalar con: pip install faster-whisper")
+        print("🔗 Más info: https://github.com/SYSTRAN/faster-whisper")
         exit(1)
     
     run_server()
\ No newline at end of file